@@ -1,10 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 import logging
 from dotenv import load_dotenv
 from mastra_handler import MastraHandler
 from composio_helper import ComposioHelper
+from meeting_analytics import MeetingAnalytics
+from request_profiler import RequestProfiler
+from request_ingestion import PayloadReader, PayloadError
+from traffic_recorder import TrafficRecorder
 
 # Load environment variables from root directory
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -16,22 +20,115 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Initialize handlers
-mastra_handler = MastraHandler()
-composio_helper = ComposioHelper()
+# Initialize handlers; upstream HTTP goes through the recorder in record/replay mode
+traffic_recorder = TrafficRecorder()
+mastra_handler = MastraHandler(http=traffic_recorder.client())
+composio_helper = ComposioHelper(http=traffic_recorder.client())
+meeting_analytics = MeetingAnalytics(db_path=os.getenv('ANALYTICS_DB_PATH', 'meeting_analytics.sqlite3'))
+request_profiler = RequestProfiler()
+payload_reader = PayloadReader()
+
+# Let Werkzeug reject oversized bodies with a Content-Length before we read them
+app.config['MAX_CONTENT_LENGTH'] = payload_reader.max_request_bytes
+
+# Request body schemas; max_length names a PayloadReader limit or gives an explicit size
+TRANSCRIPT_FIELD = {'type': str, 'required': True, 'max_length': 'max_transcript_chars'}
+
+VAPI_WEBHOOK_SCHEMA = {
+    'transcript': TRANSCRIPT_FIELD,
+    'request_type': {'type': str, 'max_length': 100}
+}
+
+SMART_ASSISTANT_SCHEMA = {
+    'transcript': TRANSCRIPT_FIELD,
+    'current_goal': {'type': str},
+    'meeting_context': {'type': dict}
+}
+
+MEETING_ANALYSIS_SCHEMA = {
+    'transcript': TRANSCRIPT_FIELD,
+    'goals': {'type': list},
+    'decisions': {'type': (dict, list)},
+    'team': {'type': str, 'max_length': 200},
+    'timestamp': {'type': (str, int, float), 'max_length': 64}
+}
+
+ANALYTICS_INGEST_SCHEMA = {
+    'meetings': {'type': list, 'required': True, 'max_length': 'max_batch_items'}
+}
+
+# Time upstream calls and response parsing when a request is being profiled
+request_profiler.instrument(mastra_handler, [
+    'query_public_agent',
+    'process_transcript',
+    'process_smart_assistant',
+    'process_meeting_analysis',
+    '_extract_suggestions',
+    '_extract_insights',
+    '_extract_recommendations',
+    '_extract_time_optimization',
+    '_detect_agenda_drift',
+    '_extract_summary',
+    '_extract_action_items',
+    '_extract_key_decisions',
+    '_calculate_efficiency_score'
+])
+request_profiler.instrument(composio_helper, [
+    'push_tasks',
+    '_push_to_notion',
+    '_push_to_jira',
+    'get_available_connections',
+    '_fetch_connections'
+])
+
+@app.before_request
+def start_profiling():
+    """
+    Start a profile for requests that opt in via config or signed header
+    """
+    if request.path.startswith('/admin/'):
+        return
+    
+    enabled, capture_cprofile = request_profiler.should_profile(request.method, request.path, request.headers)
+    if not enabled:
+        return
+    
+    request_profiler.start(request.method, request.path, capture_cprofile)
+
+@app.after_request
+def finish_profiling(response):
+    """
+    Store the profile and tell the caller where to find it
+    """
+    profile_id = request_profiler.finish(response.status_code)
+    if profile_id is not None:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.teardown_request
+def discard_profiling(exc):
+    request_profiler.discard()
+
+@app.errorhandler(PayloadError)
+def handle_payload_error(e):
+    logger.warning(f"Rejected request body on {request.path}: {e.message}")
+    return jsonify({'error': e.message}), e.status_code
+
+def read_payload(schema):
+    """
+    Stream, size-check and validate the JSON body for the current request
+    """
+    with request_profiler.phase('parse_json'):
+        return payload_reader.read_json(request, schema)
 
 @app.route('/vapi-webhook', methods=['POST'])
 def vapi_webhook():
     """
     Webhook endpoint that receives transcript from Vapi.ai
     """
+    data = read_payload(VAPI_WEBHOOK_SCHEMA)
+    
     try:
-        # Get JSON payload
-        data = request.get_json()
-        
-        if not data or 'transcript' not in data:
-            return jsonify({'error': 'Missing transcript in request'}), 400
-        
         transcript = data['transcript']
         request_type = data.get('request_type', 'engineering_discussion_analysis')
         logger.info(f"Received transcript: {transcript[:100]}...")
@@ -75,12 +172,9 @@ def smart_assistant():
     """
     Smart assistant endpoint for real-time meeting insights
     """
+    data = read_payload(SMART_ASSISTANT_SCHEMA)
+    
     try:
-        data = request.get_json()
-        
-        if not data or 'transcript' not in data:
-            return jsonify({'error': 'Missing transcript in request'}), 400
-        
         transcript = data['transcript']
         current_goal = data.get('current_goal', '')
         meeting_context = data.get('meeting_context', {})
@@ -117,12 +211,9 @@ def meeting_analysis():
     """
     Comprehensive meeting analysis endpoint
     """
+    data = read_payload(MEETING_ANALYSIS_SCHEMA)
+    
     try:
-        data = request.get_json()
-        
-        if not data or 'transcript' not in data:
-            return jsonify({'error': 'Missing transcript in request'}), 400
-        
         transcript = data['transcript']
         goals = data.get('goals', [])
         decisions = data.get('decisions', {})
@@ -149,6 +240,19 @@ def meeting_analysis():
             'risk_analysis': mastra_response.get('risk_analysis', {})
         }
         
+        # Record the meeting for team rollups when the caller identifies a team;
+        # a bad record must not throw away the analysis we already have
+        if data.get('team'):
+            try:
+                meeting_analytics.ingest([{
+                    'team': data['team'],
+                    'timestamp': data.get('timestamp'),
+                    'goals': goals,
+                    'decisions': decisions
+                }])
+            except Exception as e:
+                logger.warning(f"Failed to record meeting for analytics: {str(e)}")
+        
         logger.info(f"Meeting analysis completed. Efficiency score: {response_data['efficiency_score']}")
         return jsonify(response_data), 200
         
@@ -156,6 +260,77 @@ def meeting_analysis():
         logger.error(f"Error processing meeting analysis: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/analytics/meetings', methods=['POST'])
+def ingest_meetings():
+    """
+    Bulk ingest meeting goal/decision records for efficiency analytics
+    """
+    data = read_payload(ANALYTICS_INGEST_SCHEMA)
+    
+    try:
+        ingested = meeting_analytics.ingest(data['meetings'])
+        return jsonify({'ingested': ingested, 'total': len(meeting_analytics)}), 200
+        
+    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+        return jsonify({'error': f'Invalid meeting record: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error ingesting meetings: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/analytics/rollups', methods=['GET'])
+def analytics_rollups():
+    """
+    Efficiency rollups by team and time window
+    """
+    try:
+        rollups = meeting_analytics.rollup(
+            team=request.args.get('team'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            window=request.args.get('window', 'week'),
+            rolling=request.args.get('rolling', 4, type=int)
+        )
+        return jsonify({'rollups': rollups}), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error computing analytics rollups: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    List the most recent request profiles
+    """
+    if not request_profiler.check_admin(request.headers):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'worker': os.getpid(), 'profiles': request_profiler.list_profiles()}), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Fetch one request profile as json, pstats text or collapsed stacks
+    """
+    if not request_profiler.check_admin(request.headers):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found', 'worker': os.getpid()}), 404
+    
+    fmt = request.args.get('format', 'json')
+    try:
+        exported = request_profiler.export(profile, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if fmt == 'json':
+        exported['worker'] = os.getpid()
+        return jsonify(exported), 200
+    return Response(exported, mimetype='text/plain', headers={'X-Profile-Worker': str(os.getpid())}), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -2,6 +2,8 @@ import requests
 import os
 import logging
 import json
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from root directory
@@ -9,11 +11,132 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 logger = logging.getLogger(__name__)
 
+# Connection statuses that mean an integration can accept tasks
+ACTIVE_CONNECTION_STATUSES = {'active', 'connected', 'enabled'}
+
+class ConnectionRegistry:
+    """
+    TTL cache of connected Composio integrations with background refresh
+    
+    The first lookup fetches synchronously, and concurrent callers wait for
+    that single fetch instead of starting their own. After that, an expired
+    entry is still served while a single background thread refreshes it,
+    so task pushes never wait on discovery. Failed lookups, including
+    responses in an unrecognised shape, are retried after a shorter interval.
+    """
+    
+    def __init__(self, fetch, ttl=300, retry_interval=30):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        
+        self._apps = None
+        self._expires_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+    
+    def connected_apps(self):
+        """
+        Return the set of connected app names, or None if discovery has never succeeded
+        """
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._apps
+            
+            if self._refreshing:
+                if self._apps is None:
+                    # Wait for the in-flight first fetch rather than duplicating it
+                    self._refreshed.wait_for(lambda: not self._refreshing)
+                # Otherwise another thread is refreshing; serve the stale set
+                return self._apps
+            
+            self._refreshing = True
+            apps = self._apps
+        
+        if apps is not None:
+            threading.Thread(target=self._refresh, daemon=True).start()
+            return apps
+        
+        self._refresh()
+        return self._apps
+    
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0
+    
+    def _refresh(self):
+        apps = None
+        try:
+            connections = self.fetch()
+            if connections is not None:
+                apps = self._connected_app_names(connections)
+        except Exception as e:
+            # Never let discovery take down the refresh thread or push_tasks
+            logger.error(f"Error discovering Composio connections: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                if apps is None:
+                    self._expires_at = time.monotonic() + self.retry_interval
+                else:
+                    self._apps = apps
+                    self._expires_at = time.monotonic() + self.ttl
+                self._refreshed.notify_all()
+        
+        if apps is not None:
+            logger.info(f"Discovered Composio connections: {sorted(apps) or 'none'}")
+    
+    def _connected_app_names(self, connections):
+        """
+        Normalize a connections response to lowercase app names that are active
+        
+        Returns None for a response shape we don't recognise, so it counts as
+        a failed discovery rather than "nothing connected".
+        """
+        if isinstance(connections, dict):
+            connections = connections.get('items', connections.get('connections'))
+        if not isinstance(connections, list):
+            logger.warning(f"Unrecognised Composio connections response: {type(connections).__name__}")
+            return None
+        
+        apps = set()
+        for connection in connections:
+            if isinstance(connection, str):
+                apps.add(connection.lower())
+                continue
+            if not isinstance(connection, dict):
+                continue
+            
+            name = connection.get('appName') or connection.get('app') or connection.get('name')
+            if not isinstance(name, str):
+                # Numeric ids or nested objects don't name a destination
+                continue
+            status = str(connection.get('status', 'active')).lower()
+            if name and status in ACTIVE_CONNECTION_STATUSES:
+                apps.add(name.lower())
+        return apps
+
 class ComposioHelper:
-    def __init__(self):
+    def __init__(self, http=None):
+        # HTTP client; a TrafficRecorder swaps this out to record or replay calls
+        self.http = http or requests
+        
         self.api_key = os.getenv('COMPOSIO_API_KEY')
         self.base_url = os.getenv('COMPOSIO_BASE_URL', 'https://api.composio.dev')
         
+        # Per-destination switches, applied on top of connection discovery
+        self.enabled_destinations = {
+            'notion': os.getenv('COMPOSIO_NOTION_ENABLED', 'true').lower() == 'true',
+            'jira': os.getenv('COMPOSIO_JIRA_ENABLED', 'true').lower() == 'true'
+        }
+        self.connection_registry = ConnectionRegistry(
+            # Look the method up per call so instrumentation wrappers apply
+            lambda: self._fetch_connections(),
+            ttl=int(os.getenv('COMPOSIO_CONNECTIONS_TTL', 300)),
+            retry_interval=int(os.getenv('COMPOSIO_CONNECTIONS_RETRY', 30))
+        )
+        
         if not self.api_key:
             logger.warning("Composio API key not configured")
     
@@ -29,12 +152,12 @@ class ComposioHelper:
             logger.info("No tasks to push")
             return True
         
+        destinations = self._get_destinations()
+        if not destinations:
+            logger.info("No connected external tools to push tasks to")
+            return False
+        
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
             success_count = 0
             
             for task in tasks:
@@ -48,13 +171,10 @@ class ComposioHelper:
                         'status': 'todo'
                     }
                     
-                    # Push to Notion (if configured)
-                    if self._push_to_notion(task_payload):
-                        success_count += 1
-                    
-                    # Push to Jira (if configured)
-                    if self._push_to_jira(task_payload):
-                        success_count += 1
+                    # Push only to destinations that are connected and enabled
+                    for push in destinations:
+                        if push(task_payload):
+                            success_count += 1
                         
                 except Exception as e:
                     logger.error(f"Failed to push task '{task.get('title', 'Unknown')}': {str(e)}")
@@ -66,6 +186,28 @@ class ComposioHelper:
             logger.error(f"Error pushing tasks to external tools: {str(e)}")
             return False
     
+    def _get_destinations(self):
+        """
+        Push functions for destinations that are enabled and connected
+        
+        Falls back to every enabled destination while connection discovery
+        has never succeeded, so tasks are not dropped when it is down.
+        """
+        pushers = {
+            'notion': self._push_to_notion,
+            'jira': self._push_to_jira
+        }
+        connected = self.connection_registry.connected_apps()
+        
+        destinations = []
+        for name, push in pushers.items():
+            if not self.enabled_destinations.get(name):
+                continue
+            if connected is not None and name not in connected:
+                continue
+            destinations.append(push)
+        return destinations
+    
     def _push_to_notion(self, task_data):
         """
         Push task to Notion via Composio
@@ -75,7 +217,7 @@ class ComposioHelper:
             # For now, we'll simulate the API call
             notion_endpoint = f"{self.base_url}/notion/tasks"
             
-            response = requests.post(
+            response = self.http.post(
                 notion_endpoint,
                 json=task_data,
                 headers={
@@ -113,7 +255,7 @@ class ComposioHelper:
                 'priority': self._map_priority_to_jira(task_data['priority'])
             }
             
-            response = requests.post(
+            response = self.http.post(
                 jira_endpoint,
                 json=jira_payload,
                 headers={
@@ -149,8 +291,15 @@ class ComposioHelper:
         """
         Get list of available external tool connections
         """
+        connections = self._fetch_connections()
+        return connections if connections is not None else []
+    
+    def _fetch_connections(self):
+        """
+        Fetch connections from Composio, returning None on failure
+        """
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/connections",
                 headers={'Authorization': f'Bearer {self.api_key}'},
                 timeout=10
@@ -160,8 +309,8 @@ class ComposioHelper:
                 return response.json()
             else:
                 logger.warning(f"Failed to get connections: {response.status_code}")
-                return []
+                return None
                 
         except Exception as e:
             logger.error(f"Error getting connections: {str(e)}")
-            return [] 
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -10,7 +10,10 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 logger = logging.getLogger(__name__)
 
 class MastraHandler:
-    def __init__(self):
+    def __init__(self, http=None):
+        # HTTP client; a TrafficRecorder swaps this out to record or replay calls
+        self.http = http or requests
+        
         # Use public Mastra API
         self.base_url = "https://api.mastra.ai"
         self.api_key = os.getenv('MASTRA_API_KEY')
@@ -39,7 +42,7 @@ class MastraHandler:
             
             logger.info(f"Querying public Mastra agent: {agent_id}")
             
-            response = requests.post(
+            response = self.http.post(
                 url,
                 json=payload,
                 headers=headers,
@@ -267,15 +270,18 @@ class MastraHandler:
         """
         Provide mock response for testing when Mastra API is not available
         """
+        # Lowercase once; multi-megabyte transcripts make every copy expensive
+        transcript_lower = transcript.lower()
+        
         # Extract key topics from transcript
-        topics = self._extract_topics_from_transcript(transcript)
+        topics = self._extract_topics_from_transcript(transcript_lower)
         
         summary = f"Meeting analysis completed. Key topics discussed: {', '.join(topics[:3])}. "
         summary += "This was a productive civic meeting with clear action items identified."
         
         # Generate mock tasks based on transcript content
         tasks = []
-        if 'microservice' in transcript.lower() or 'architecture' in transcript.lower():
+        if 'microservice' in transcript_lower or 'architecture' in transcript_lower:
             tasks.append({
                 'title': 'Implement microservice architecture',
                 'assignee': 'Development Team',
@@ -283,7 +289,7 @@ class MastraHandler:
                 'description': 'Set up microservice architecture for better scalability'
             })
         
-        if 'security' in transcript.lower() or 'jwt' in transcript.lower():
+        if 'security' in transcript_lower or 'jwt' in transcript_lower:
             tasks.append({
                 'title': 'Implement JWT authentication',
                 'assignee': 'Security Team',
@@ -291,7 +297,7 @@ class MastraHandler:
                 'description': 'Set up JWT tokens and refresh token rotation'
             })
         
-        if 'database' in transcript.lower() or 'schema' in transcript.lower():
+        if 'database' in transcript_lower or 'schema' in transcript_lower:
             tasks.append({
                 'title': 'Design database schema',
                 'assignee': 'Database Team',
@@ -313,12 +319,11 @@ class MastraHandler:
             'suggestions': suggestions
         }
     
-    def _extract_topics_from_transcript(self, transcript):
+    def _extract_topics_from_transcript(self, transcript_lower):
         """
-        Extract key topics from transcript for mock response
+        Extract key topics from an already-lowercased transcript for mock response
         """
         topics = []
-        transcript_lower = transcript.lower()
         
         if 'microservice' in transcript_lower:
             topics.append('Microservice Architecture')
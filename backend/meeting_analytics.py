@@ -0,0 +1,352 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+# The Unix epoch is a Thursday; shift by 3 days so week buckets start on Monday
+WEEK_OFFSET = 3 * DAY_SECONDS
+
+ROLLUP_WINDOWS = ('day', 'week', 'month')
+
+# Accepted timestamp range: the epoch through the end of year 9999
+MAX_TIMESTAMP = 253402300799
+
+# Goal and decision counts are stored in int32 columns
+MAX_COUNT = 2 ** 31 - 1
+
+def efficiency_scores(completed_goals, total_goals, decisions):
+    """
+    Vectorized form of MastraHandler._calculate_efficiency_score
+    """
+    completed_goals = np.asarray(completed_goals, dtype=np.float64)
+    total_goals = np.asarray(total_goals, dtype=np.float64)
+    decisions = np.asarray(decisions, dtype=np.float64)
+
+    completion_rate = np.divide(
+        completed_goals,
+        total_goals,
+        out=np.zeros_like(completed_goals),
+        where=total_goals > 0
+    )
+    return np.minimum(1000.0, completion_rate * 600 + decisions * 100)
+
+def parse_timestamp(value):
+    """
+    Convert an ISO 8601 string or epoch number to UTC epoch seconds
+    """
+    if value is None or value == '':
+        return int(datetime.now(timezone.utc).timestamp())
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value) or not 0 <= value <= MAX_TIMESTAMP:
+            raise ValueError(f"Timestamp out of range: {value}")
+        return int(value)
+
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    timestamp = int(parsed.timestamp())
+    if not 0 <= timestamp <= MAX_TIMESTAMP:
+        raise ValueError(f"Timestamp out of range: {value}")
+    return timestamp
+
+def parse_count(value, field):
+    """
+    Validate a goal/decision count for the int32 columns
+    """
+    count = int(value)
+    if not 0 <= count <= MAX_COUNT:
+        raise ValueError(f"{field} out of range: {value}")
+    return count
+
+def parse_meeting(meeting):
+    """
+    Reduce one meeting record to a (team, timestamp, total, completed, decisions) row
+    """
+    team = str(meeting.get('team', 'unassigned'))
+    timestamp = parse_timestamp(meeting.get('timestamp'))
+
+    goals = meeting.get('goals')
+    if goals is not None:
+        total_goals = len(goals)
+        completed_goals = sum(1 for g in goals if g.get('completed', False))
+    else:
+        total_goals = parse_count(meeting.get('total_goals', 0), 'total_goals')
+        completed_goals = parse_count(meeting.get('completed_goals', 0), 'completed_goals')
+
+    if 'decisions' in meeting:
+        decisions = len(meeting.get('decisions') or [])
+    else:
+        decisions = parse_count(meeting.get('decisions_count', 0), 'decisions_count')
+
+    return team, timestamp, total_goals, completed_goals, decisions
+
+def window_buckets(timestamps, window):
+    """
+    Map UTC epoch seconds to integer window numbers
+
+    Days are UTC calendar days, weeks run Monday to Sunday and months are
+    calendar months counted from January 1970.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if window == 'day':
+        return timestamps // DAY_SECONDS
+    if window == 'week':
+        return (timestamps + WEEK_OFFSET) // WEEK_SECONDS
+    if window == 'month':
+        return timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Unknown window '{window}', expected one of {list(ROLLUP_WINDOWS)}")
+
+def window_start(bucket, window):
+    """
+    UTC start of a window number produced by window_buckets
+    """
+    if window == 'day':
+        seconds = bucket * DAY_SECONDS
+    elif window == 'week':
+        seconds = bucket * WEEK_SECONDS - WEEK_OFFSET
+    else:
+        seconds = int(np.datetime64(bucket, 'M').astype('datetime64[s]').astype(np.int64))
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+class MeetingAnalytics:
+    """
+    Columnar store of per-meeting goal/decision counts with vectorized rollups
+
+    With a `db_path`, records are persisted to SQLite and the NumPy columns
+    act as a per-process cache: every ingest and rollup first pulls rows
+    added since the last sync, so all gunicorn workers answer from the same
+    history and it survives restarts. Without one, the store is in-memory.
+    """
+
+    def __init__(self, db_path=None, initial_capacity=1024):
+        self._lock = threading.Lock()
+        # Relative paths are resolved next to this module, not the working directory
+        self.db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), db_path) if db_path else None
+        self._db = None
+        self._db_pid = None
+        self._last_rowid = 0
+        self._team_codes = {}
+        self._team_names = []
+        self._size = 0
+        self._capacity = max(1, int(initial_capacity))
+
+        self._team = np.empty(self._capacity, dtype=np.int32)
+        self._timestamp = np.empty(self._capacity, dtype=np.int64)
+        self._total_goals = np.empty(self._capacity, dtype=np.int32)
+        self._completed_goals = np.empty(self._capacity, dtype=np.int32)
+        self._decisions = np.empty(self._capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self._size
+
+    def ingest(self, meetings):
+        """
+        Append meeting records and return the number stored
+
+        Each record needs a `team` and may carry a `timestamp` (ISO 8601 or
+        epoch seconds). Counts come either from raw `goals`/`decisions`
+        lists as sent to /meeting-analysis, or from precomputed
+        `total_goals`, `completed_goals` and `decisions_count` fields.
+        """
+        if not meetings:
+            return 0
+
+        # Validate the whole batch before anything is stored
+        rows = [parse_meeting(meeting) for meeting in meetings]
+
+        with self._lock:
+            if self.db_path:
+                db = self._connection()
+                with db:
+                    db.executemany(
+                        'INSERT INTO meetings (team, timestamp, total_goals, completed_goals, decisions) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        rows
+                    )
+                self._sync()
+            else:
+                self._append(rows)
+            total = self._size
+
+        logger.info(f"Ingested {len(rows)} meetings into analytics store ({total} total)")
+        return len(rows)
+
+    def rollup(self, team=None, start=None, end=None, window='week', rolling=4):
+        """
+        Aggregate stored meetings per team and time window
+
+        Returns one row per (team, window) ordered by team then window start,
+        with meeting count, average efficiency score, goal completion rate,
+        total decisions and a rolling average efficiency over the team's
+        last `rolling` populated windows.
+        """
+        if window not in ROLLUP_WINDOWS:
+            raise ValueError(f"Unknown window '{window}', expected one of {list(ROLLUP_WINDOWS)}")
+        rolling = max(1, int(rolling))
+
+        with self._lock:
+            if self.db_path:
+                self._sync()
+            size = self._size
+            teams = self._team[:size].copy()
+            timestamps = self._timestamp[:size].copy()
+            total_goals = self._total_goals[:size].copy()
+            completed_goals = self._completed_goals[:size].copy()
+            decisions = self._decisions[:size].copy()
+            team_names = list(self._team_names)
+            team_code = self._team_codes.get(team) if team is not None else None
+
+        mask = np.ones(size, dtype=bool)
+        if team is not None:
+            if team_code is None:
+                return []
+            mask &= teams == team_code
+        if start is not None:
+            mask &= timestamps >= parse_timestamp(start)
+        if end is not None:
+            mask &= timestamps < parse_timestamp(end)
+
+        if not mask.any():
+            return []
+
+        teams = teams[mask]
+        buckets = window_buckets(timestamps[mask], window)
+        total_goals = total_goals[mask]
+        completed_goals = completed_goals[mask]
+        decisions = decisions[mask]
+        scores = efficiency_scores(completed_goals, total_goals, decisions)
+
+        # Pack (team, bucket) into one int64 key so np.unique sorts by team first
+        first_bucket = buckets.min()
+        span = int(buckets.max() - first_bucket) + 1
+        keys = teams.astype(np.int64) * span + (buckets - first_bucket)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        group_teams = unique_keys // span
+        group_buckets = unique_keys % span + first_bucket
+        group_count = len(unique_keys)
+
+        meeting_counts = np.bincount(inverse, minlength=group_count)
+        score_sums = np.bincount(inverse, weights=scores, minlength=group_count)
+        goal_sums = np.bincount(inverse, weights=total_goals, minlength=group_count)
+        completed_sums = np.bincount(inverse, weights=completed_goals, minlength=group_count)
+        decision_sums = np.bincount(inverse, weights=decisions, minlength=group_count)
+
+        avg_scores = score_sums / meeting_counts
+        completion_rates = np.divide(
+            completed_sums,
+            goal_sums,
+            out=np.zeros_like(completed_sums),
+            where=goal_sums > 0
+        )
+        rolling_scores = self._rolling_mean(avg_scores, group_teams, rolling)
+
+        return [
+            {
+                'team': team_names[int(group_teams[i])],
+                'window_start': window_start(int(group_buckets[i]), window).isoformat(),
+                'meetings': int(meeting_counts[i]),
+                'efficiency_score': round(float(avg_scores[i]), 2),
+                'completion_rate': round(float(completion_rates[i]), 4),
+                'decisions': int(decision_sums[i]),
+                'rolling_efficiency_score': round(float(rolling_scores[i]), 2)
+            }
+            for i in range(group_count)
+        ]
+
+    def _rolling_mean(self, values, group_ids, size):
+        """
+        Trailing mean over `size` rows, restarting at each group boundary
+        """
+        positions = np.arange(len(values))
+        # Index of the first row belonging to each row's group
+        is_start = np.ones(len(values), dtype=bool)
+        is_start[1:] = group_ids[1:] != group_ids[:-1]
+        group_start = np.maximum.accumulate(np.where(is_start, positions, 0))
+
+        window_start = np.maximum(group_start, positions - size + 1)
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return (cumulative[positions + 1] - cumulative[window_start]) / (positions - window_start + 1)
+
+    def _connection(self):
+        """
+        SQLite connection for this process, opened lazily so forked workers get their own
+        """
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS meetings ('
+                'team TEXT NOT NULL, timestamp INTEGER NOT NULL, total_goals INTEGER NOT NULL, '
+                'completed_goals INTEGER NOT NULL, decisions INTEGER NOT NULL)'
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _sync(self):
+        """
+        Append rows persisted by any process since the last sync
+        """
+        cursor = self._connection().execute(
+            'SELECT rowid, team, timestamp, total_goals, completed_goals, decisions '
+            'FROM meetings WHERE rowid > ? ORDER BY rowid',
+            (self._last_rowid,)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            self._append([row[1:] for row in rows])
+            self._last_rowid = rows[-1][0]
+
+    def _append(self, rows):
+        """
+        Append validated (team, timestamp, total, completed, decisions) rows to the columns
+        """
+        count = len(rows)
+        teams, timestamps, total_goals, completed_goals, decisions = zip(*rows)
+
+        self._reserve(self._size + count)
+        end = self._size + count
+        self._team[self._size:end] = [self._team_code(team) for team in teams]
+        self._timestamp[self._size:end] = timestamps
+        self._total_goals[self._size:end] = total_goals
+        self._completed_goals[self._size:end] = completed_goals
+        self._decisions[self._size:end] = decisions
+        self._size = end
+
+    def _team_code(self, team):
+        """
+        Map a team name to its integer column code
+        """
+        code = self._team_codes.get(team)
+        if code is None:
+            code = len(self._team_names)
+            self._team_codes[team] = code
+            self._team_names.append(team)
+        return code
+
+    def _reserve(self, required):
+        """
+        Grow the column arrays geometrically to hold `required` rows
+        """
+        if required <= self._capacity:
+            return
+
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+
+        for name in ('_team', '_timestamp', '_total_goals', '_completed_goals', '_decisions'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+        self._capacity = capacity
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import zlib
+from dotenv import load_dotenv
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Load environment variables from root directory
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class PayloadError(Exception):
+    """
+    Request body rejected during ingestion, carrying the HTTP status to return
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class PayloadReader:
+    """
+    Bounded streaming reader for JSON request bodies
+
+    The body is pulled from the WSGI stream in fixed-size chunks (so chunked
+    transfer encoding works), optionally gunzipped incrementally, and
+    rejected as soon as it exceeds the configured limits. Memory per request
+    is therefore capped at roughly MAX_DECOMPRESSED_BYTES plus the parsed
+    payload, regardless of what the client sends.
+    """
+
+    def __init__(self):
+        self.max_request_bytes = int(os.getenv('MAX_REQUEST_BYTES', 5 * 1024 * 1024))
+        self.max_decompressed_bytes = int(os.getenv('MAX_DECOMPRESSED_BYTES', 20 * 1024 * 1024))
+        self.max_transcript_chars = int(os.getenv('MAX_TRANSCRIPT_CHARS', 2 * 1024 * 1024))
+        self.max_field_chars = int(os.getenv('MAX_FIELD_CHARS', 10000))
+        self.max_list_items = int(os.getenv('MAX_LIST_ITEMS', 1000))
+        self.max_batch_items = int(os.getenv('MAX_BATCH_ITEMS', 50000))
+
+    def read_json(self, request, schema):
+        """
+        Read, decompress, parse and validate a JSON body against `schema`
+
+        `schema` maps field names to dicts with `type`, and optionally
+        `required` and `max_length` (characters for strings, items for
+        lists/dicts). `max_length` may name one of this reader's limit
+        attributes, e.g. 'max_transcript_chars'.
+        """
+        if not request.is_json:
+            raise PayloadError('Request body must be application/json', 415)
+
+        body = self._read_body(request)
+        if not body:
+            raise PayloadError('Empty request body')
+
+        try:
+            data = json.loads(body)
+        except (ValueError, RecursionError) as e:
+            raise PayloadError(f'Invalid JSON body: {str(e)}')
+        # Release the raw buffer before validation; only the parsed payload is kept
+        del body
+
+        if not isinstance(data, dict):
+            raise PayloadError('JSON body must be an object')
+
+        self._validate(data, schema)
+        return data
+
+    def _read_body(self, request):
+        encoding = request.headers.get('Content-Encoding', 'identity').lower()
+        if encoding not in ('identity', 'gzip'):
+            raise PayloadError(f'Unsupported Content-Encoding: {encoding}', 415)
+
+        if request.content_length is not None and request.content_length > self.max_request_bytes:
+            raise PayloadError('Request body too large', 413)
+
+        # wbits=16+MAX_WBITS accepts the gzip header and trailer
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+        body = bytearray()
+        received = 0
+
+        try:
+            stream = request.stream
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > self.max_request_bytes:
+                    raise PayloadError('Request body too large', 413)
+
+                if decompressor is None:
+                    body += chunk
+                else:
+                    self._inflate(decompressor, chunk, body)
+
+                if len(body) > self.max_decompressed_bytes:
+                    raise PayloadError('Decompressed request body too large', 413)
+        except RequestEntityTooLarge:
+            raise PayloadError('Request body too large', 413)
+
+        if decompressor is not None:
+            body += decompressor.flush()
+            if not decompressor.eof:
+                raise PayloadError('Truncated gzip request body')
+
+        return body
+
+    def _inflate(self, decompressor, chunk, body):
+        """
+        Decompress one chunk without letting a gzip bomb overrun the limit
+        """
+        try:
+            data = chunk
+            while data:
+                # Never inflate more than one byte past the remaining budget
+                budget = self.max_decompressed_bytes - len(body) + 1
+                body += decompressor.decompress(data, budget)
+                if len(body) > self.max_decompressed_bytes:
+                    return
+                data = decompressor.unconsumed_tail
+        except zlib.error as e:
+            raise PayloadError(f'Invalid gzip request body: {str(e)}')
+
+    def _validate(self, data, schema):
+        for field, rules in schema.items():
+            if field not in data or data[field] is None:
+                if rules.get('required'):
+                    raise PayloadError(f'Missing {field} in request')
+                continue
+
+            value = data[field]
+            expected = rules['type']
+            if not isinstance(value, expected) or isinstance(value, bool) and expected is not bool:
+                names = expected.__name__ if isinstance(expected, type) else '/'.join(t.__name__ for t in expected)
+                raise PayloadError(f'Field {field} must be of type {names}')
+
+            max_length = rules.get('max_length')
+            if isinstance(max_length, str):
+                max_length = getattr(self, max_length)
+            elif max_length is None:
+                max_length = self.max_field_chars if isinstance(value, str) else self.max_list_items
+
+            if isinstance(value, (str, list, dict)) and len(value) > max_length:
+                raise PayloadError(f'Field {field} exceeds maximum length of {max_length}', 413)
@@ -0,0 +1,331 @@
+import cProfile
+import functools
+import hashlib
+import hmac
+import io
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables from root directory
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+logger = logging.getLogger(__name__)
+
+# Signed profiling headers older than this are rejected
+SIGNATURE_MAX_AGE = 300
+
+class RequestProfiler:
+    """
+    Opt-in per-request phase timers and cProfile capture
+
+    Profiling is active for every request when PROFILING_ENABLED is set, or
+    for a single request carrying a valid `X-Profile-Request` header of the
+    form `<unix timestamp>:<hex HMAC-SHA256 of "timestamp:METHOD:path">`
+    keyed with PROFILING_SECRET. PROFILING_CPROFILE, or `X-Profile-Mode:
+    cprofile` on a signed request, additionally captures a cProfile.
+
+    Profiles live in the worker process that served the request, so IDs are
+    prefixed with its pid to stay unique across gunicorn workers.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+        self.cprofile = os.getenv('PROFILING_CPROFILE', 'false').lower() == 'true'
+        self.secret = os.getenv('PROFILING_SECRET')
+        self.history = int(os.getenv('PROFILING_HISTORY', 50))
+
+        self._profiles = deque(maxlen=self.history)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    @property
+    def active(self):
+        return getattr(self._local, 'profile', None) is not None
+
+    def should_profile(self, method, path, headers):
+        """
+        Decide whether a request opts in to profiling and with which mode
+        """
+        signed = headers.get('X-Profile-Request')
+        verified = bool(signed) and self._verify_signature(signed, method, path)
+        # cProfile is expensive, so only signed requests may ask for it
+        wants_cprofile = self.cprofile or (verified and headers.get('X-Profile-Mode', '').lower() == 'cprofile')
+
+        if self.enabled or verified:
+            return True, wants_cprofile
+        return False, False
+
+    def start(self, method, path, capture_cprofile=False):
+        """
+        Begin profiling the current request on this thread
+        """
+        profile = {
+            'id': f"{os.getpid()}-{next(self._ids)}",
+            'method': method,
+            'path': path,
+            'started_at': time.time(),
+            'phases': [],
+            'status': None,
+            'duration_ms': None,
+            '_start': time.perf_counter(),
+            '_depth': 0,
+            '_cprofile': None
+        }
+        if capture_cprofile:
+            profile['_cprofile'] = cProfile.Profile()
+            profile['_cprofile'].enable()
+        self._local.profile = profile
+        return profile['id']
+
+    def finish(self, status=None):
+        """
+        Stop profiling the current request and store the result
+        """
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return None
+        self._local.profile = None
+
+        if profile['_cprofile'] is not None:
+            profile['_cprofile'].disable()
+        profile['status'] = status
+        profile['duration_ms'] = (time.perf_counter() - profile['_start']) * 1000
+
+        with self._lock:
+            self._profiles.append(profile)
+
+        logger.info(f"Profiled {profile['method']} {profile['path']} in {profile['duration_ms']:.1f}ms (profile {profile['id']})")
+        return profile['id']
+
+    def discard(self):
+        """
+        Drop any unfinished profile left on this thread
+        """
+        profile = getattr(self._local, 'profile', None)
+        if profile is not None and profile['_cprofile'] is not None:
+            profile['_cprofile'].disable()
+        self._local.profile = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a named phase of the current request; no-op when not profiling
+        """
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            yield
+            return
+
+        entry = {
+            'name': name,
+            'depth': profile['_depth'],
+            'start_ms': (time.perf_counter() - profile['_start']) * 1000,
+            'duration_ms': None
+        }
+        profile['phases'].append(entry)
+        profile['_depth'] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry['duration_ms'] = (time.perf_counter() - started) * 1000
+            profile['_depth'] -= 1
+
+    def instrument(self, target, method_names):
+        """
+        Wrap methods on an object instance so each call is timed as a phase
+        """
+        prefix = type(target).__name__
+        for method_name in method_names:
+            method = getattr(target, method_name)
+            setattr(target, method_name, self._timed(f"{prefix}.{method_name}", method))
+        return target
+
+    def _timed(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.active:
+                return func(*args, **kwargs)
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def check_admin(self, headers):
+        """
+        Validate the admin bearer token against PROFILING_SECRET
+        """
+        if not self.secret:
+            return False
+        auth = headers.get('Authorization', '')
+        if not auth.startswith('Bearer '):
+            return False
+        # Compare as bytes: compare_digest rejects str containing non-ASCII
+        return hmac.compare_digest(auth[len('Bearer '):].encode(), self.secret.encode())
+
+    def list_profiles(self):
+        """
+        Summaries of the stored profiles, newest first
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        return [self._summary(p) for p in reversed(profiles)]
+
+    def get_profile(self, profile_id):
+        with self._lock:
+            for profile in self._profiles:
+                if profile['id'] == profile_id:
+                    return profile
+        return None
+
+    def export(self, profile, fmt='json'):
+        """
+        Render a stored profile as json (dict), pstats text or collapsed stacks
+        """
+        if fmt == 'json':
+            summary = self._summary(profile)
+            summary['phases'] = profile['phases']
+            return summary
+        if fmt == 'pstats':
+            return self._pstats_text(profile)
+        if fmt == 'collapsed':
+            return self._collapsed(profile)
+        raise ValueError(f"Unknown profile format '{fmt}', expected json, pstats or collapsed")
+
+    def _summary(self, profile):
+        return {
+            'id': profile['id'],
+            'method': profile['method'],
+            'path': profile['path'],
+            'status': profile['status'],
+            'started_at': profile['started_at'],
+            'duration_ms': round(profile['duration_ms'], 3),
+            'cprofile': profile['_cprofile'] is not None
+        }
+
+    def _pstats_text(self, profile):
+        """
+        cProfile output sorted by cumulative time, or the phase table without it
+        """
+        if profile['_cprofile'] is None:
+            lines = [f"{profile['method']} {profile['path']} {profile['duration_ms']:.3f}ms (no cProfile captured)"]
+            for entry in profile['phases']:
+                lines.append(f"{'  ' * entry['depth']}{entry['name']}: {entry['duration_ms']:.3f}ms")
+            return '\n'.join(lines) + '\n'
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile['_cprofile'], stream=stream)
+        stats.sort_stats('cumulative').print_stats()
+        return stream.getvalue()
+
+    def _collapsed(self, profile):
+        """
+        Folded stacks (`frame;frame;frame <microseconds>`) for flame graph tools
+
+        Phase timers give exact self times. With cProfile, each function's
+        self time is split across its callers in proportion to the
+        cumulative time each caller spent in it.
+        """
+        if profile['_cprofile'] is not None:
+            return self._cprofile_collapsed(profile['_cprofile'])
+
+        root = f"{profile['method']} {profile['path']}"
+        lines = []
+        stack = []
+        phases = profile['phases']
+        for index, entry in enumerate(phases):
+            del stack[entry['depth']:]
+            stack.append(entry['name'])
+            child_ms = sum(child['duration_ms'] for child in self._children(phases, index))
+            self_us = int((entry['duration_ms'] - child_ms) * 1000)
+            if self_us > 0:
+                lines.append(f"{';'.join([root] + stack)} {self_us}")
+
+        top_level = sum(entry['duration_ms'] for entry in phases if entry['depth'] == 0)
+        root_us = int((profile['duration_ms'] - top_level) * 1000)
+        if root_us > 0:
+            lines.insert(0, f"{root} {root_us}")
+        return '\n'.join(lines) + '\n'
+
+    def _children(self, phases, index):
+        depth = phases[index]['depth']
+        for entry in phases[index + 1:]:
+            if entry['depth'] <= depth:
+                break
+            if entry['depth'] == depth + 1:
+                yield entry
+
+    def _cprofile_collapsed(self, cprofile, max_depth=32, max_paths=200):
+        stats = pstats.Stats(cprofile).stats
+        memo = {}
+        visiting = set()
+
+        def label(func):
+            filename, line, name = func
+            return f"{name} ({os.path.basename(filename)}:{line})"
+
+        def stacks(func):
+            # (frames, weight) pairs from a root down to func, weights summing to 1,
+            # plus whether a recursive caller was skipped (such results aren't cached)
+            if func in memo:
+                return memo[func], False
+            callers = stats.get(func, (0, 0, 0, 0, {}))[4]
+            live = {caller: edge for caller, edge in callers.items() if caller not in visiting}
+            truncated = len(live) < len(callers)
+            if not live:
+                return [([label(func)], 1.0)], truncated
+
+            visiting.add(func)
+            total = sum(edge[3] for edge in live.values())
+            result = []
+            for caller, edge in live.items():
+                share = edge[3] / total if total else 1.0 / len(live)
+                paths, caller_truncated = stacks(caller)
+                truncated = truncated or caller_truncated
+                for path, weight in paths:
+                    result.append(((path + [label(func)])[-max_depth:], weight * share))
+            visiting.discard(func)
+
+            result.sort(key=lambda item: item[1], reverse=True)
+            result = result[:max_paths]
+            if not truncated:
+                memo[func] = result
+            return result, truncated
+
+        folded = {}
+        for func, (_, _, self_time, _, _) in stats.items():
+            if self_time <= 0:
+                continue
+            for path, weight in stacks(func)[0]:
+                key = ';'.join(path)
+                folded[key] = folded.get(key, 0) + self_time * weight
+
+        lines = [f"{key} {int(seconds * 1e6)}" for key, seconds in folded.items() if int(seconds * 1e6) > 0]
+        return '\n'.join(sorted(lines)) + '\n'
+
+    def _verify_signature(self, signed, method, path):
+        """
+        Check an `X-Profile-Request` header against PROFILING_SECRET
+        """
+        if not self.secret:
+            return False
+        try:
+            timestamp, signature = signed.split(':', 1)
+            if abs(time.time() - int(timestamp)) > SIGNATURE_MAX_AGE:
+                return False
+        except ValueError:
+            return False
+
+        expected = hmac.new(
+            self.secret.encode(),
+            f"{timestamp}:{method}:{path}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(signature.encode(), expected.encode())
@@ -0,0 +1,152 @@
+"""
+Tests for Composio connection discovery and task routing
+"""
+
+import threading
+import time
+
+import pytest
+
+from composio_helper import ComposioHelper, ConnectionRegistry
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+class FakeHttp:
+    """
+    Stand-in for `requests` that records calls and answers /connections
+    """
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url.rsplit('/', 1)[-1])
+        if self.connections is None:
+            return FakeResponse(500)
+        return FakeResponse(200, self.connections)
+
+    def post(self, url, **kwargs):
+        self.calls.append(url.rsplit('/', 2)[-2])
+        return FakeResponse(200)
+
+@pytest.fixture(autouse=True)
+def composio_env(monkeypatch):
+    monkeypatch.setenv('COMPOSIO_API_KEY', 'key')
+    monkeypatch.setenv('COMPOSIO_NOTION_ENABLED', 'true')
+    monkeypatch.setenv('COMPOSIO_JIRA_ENABLED', 'true')
+
+def counting_fetch(result):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return result
+    return fetch, calls
+
+def test_registry_caches_until_ttl():
+    fetch, calls = counting_fetch({'items': [{'appName': 'Notion', 'status': 'ACTIVE'}, {'appName': 'jira', 'status': 'INACTIVE'}]})
+    registry = ConnectionRegistry(fetch, ttl=60)
+
+    assert registry.connected_apps() == {'notion'}
+    assert registry.connected_apps() == {'notion'}
+    assert len(calls) == 1
+
+def test_registry_serves_stale_set_while_refreshing():
+    fetch, calls = counting_fetch(['notion'])
+    registry = ConnectionRegistry(fetch, ttl=60)
+    registry.connected_apps()
+
+    registry.fetch = lambda: ['jira']
+    registry.invalidate()
+    assert registry.connected_apps() == {'notion'}
+
+    deadline = time.monotonic() + 2
+    while registry.connected_apps() != {'jira'} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert registry.connected_apps() == {'jira'}
+
+@pytest.mark.parametrize('result', [None, {'unexpected': 'shape'}, {'items': 'nope'}, 'notion'])
+def test_failed_or_unrecognised_discovery_is_retried(result):
+    fetch, calls = counting_fetch(result)
+    registry = ConnectionRegistry(fetch, ttl=60, retry_interval=60)
+
+    assert registry.connected_apps() is None
+    assert registry.connected_apps() is None
+    assert len(calls) == 1
+
+def test_non_string_app_names_are_skipped():
+    fetch, calls = counting_fetch({'items': [
+        {'appName': 42, 'status': 'ACTIVE'},
+        {'app': {'name': 'jira'}},
+        {'name': 'notion'},
+    ]})
+    registry = ConnectionRegistry(fetch, ttl=60)
+
+    assert registry.connected_apps() == {'notion'}
+
+def test_fetch_errors_count_as_failed_discovery():
+    def broken_fetch():
+        raise RuntimeError('boom')
+
+    registry = ConnectionRegistry(broken_fetch, ttl=60, retry_interval=60)
+
+    assert registry.connected_apps() is None
+
+def test_concurrent_first_lookups_share_one_fetch():
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(2)
+        return ['notion']
+
+    registry = ConnectionRegistry(slow_fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.connected_apps())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert results == [{'notion'}] * 5
+
+def test_push_tasks_routes_to_connected_destinations_only():
+    http = FakeHttp({'items': [{'appName': 'notion', 'status': 'ACTIVE'}]})
+    helper = ComposioHelper(http=http)
+
+    assert helper.push_tasks([{'title': 'a'}, {'title': 'b'}]) is True
+    assert http.calls == ['connections', 'notion', 'notion']
+
+def test_push_tasks_ignores_non_string_app_names():
+    http = FakeHttp({'items': [{'appName': 7}, {'appName': 'jira'}]})
+    helper = ComposioHelper(http=http)
+
+    assert helper.push_tasks([{'title': 'a'}]) is True
+    assert http.calls == ['connections', 'jira']
+
+def test_push_tasks_respects_disabled_destinations(monkeypatch):
+    monkeypatch.setenv('COMPOSIO_NOTION_ENABLED', 'false')
+    http = FakeHttp(['notion'])
+    helper = ComposioHelper(http=http)
+
+    assert helper.push_tasks([{'title': 'a'}]) is False
+    assert http.calls == ['connections']
+
+@pytest.mark.parametrize('connections', [None, {'unexpected': 'shape'}])
+def test_push_tasks_falls_back_to_enabled_destinations(connections):
+    http = FakeHttp(connections)
+    helper = ComposioHelper(http=http)
+
+    assert helper.push_tasks([{'title': 'a'}]) is True
+    assert http.calls == ['connections', 'notion', 'jira']
@@ -0,0 +1,134 @@
+"""
+Tests for the vectorized meeting analytics store
+"""
+
+import numpy as np
+import pytest
+
+from mastra_handler import MastraHandler
+from meeting_analytics import MeetingAnalytics, efficiency_scores, parse_timestamp
+
+def test_efficiency_scores_match_scalar_score():
+    handler = MastraHandler()
+    meetings = [
+        ([], {}),
+        ([{'completed': True}, {'completed': False}], ['a']),
+        ([{'completed': True}] * 3, []),
+        ([{'completed': False}], ['a'] * 12),
+    ]
+
+    expected = [handler._calculate_efficiency_score(goals, decisions) for goals, decisions in meetings]
+    scores = efficiency_scores(
+        [sum(1 for g in goals if g['completed']) for goals, _ in meetings],
+        [len(goals) for goals, _ in meetings],
+        [len(decisions) for _, decisions in meetings]
+    )
+
+    assert np.allclose(scores, expected)
+
+def test_rollup_aggregates_per_team_and_week():
+    analytics = MeetingAnalytics(initial_capacity=1)
+    analytics.ingest([
+        {'team': 'a', 'timestamp': '2026-10-19T09:00:00Z', 'total_goals': 2, 'completed_goals': 2, 'decisions_count': 1},
+        {'team': 'a', 'timestamp': '2026-10-25T18:00:00Z', 'total_goals': 2, 'completed_goals': 0, 'decisions_count': 0},
+        {'team': 'b', 'timestamp': '2026-10-20T09:00:00Z', 'goals': [{'completed': True}], 'decisions': ['x']},
+    ])
+
+    rows = analytics.rollup(window='week')
+
+    assert len(analytics) == 3
+    assert [(row['team'], row['meetings']) for row in rows] == [('a', 2), ('b', 1)]
+    assert rows[0]['efficiency_score'] == 350.0
+    assert rows[0]['completion_rate'] == 0.5
+    assert rows[1]['efficiency_score'] == 700.0
+
+def test_weeks_start_on_monday():
+    analytics = MeetingAnalytics()
+    # 2026-10-19 is a Monday, 2026-10-18 the Sunday before it
+    analytics.ingest([
+        {'team': 'a', 'timestamp': '2026-10-18T23:59:59Z'},
+        {'team': 'a', 'timestamp': '2026-10-19T00:00:00Z'},
+        {'team': 'a', 'timestamp': '2026-10-25T23:59:59Z'},
+    ])
+
+    rows = analytics.rollup(window='week')
+
+    assert [(row['window_start'], row['meetings']) for row in rows] == [
+        ('2026-10-12T00:00:00+00:00', 1),
+        ('2026-10-19T00:00:00+00:00', 2),
+    ]
+
+def test_months_are_calendar_months():
+    analytics = MeetingAnalytics()
+    analytics.ingest([
+        {'team': 'a', 'timestamp': '2026-01-31T23:00:00Z'},
+        {'team': 'a', 'timestamp': '2026-02-01T00:00:00Z'},
+        {'team': 'a', 'timestamp': '2026-02-28T12:00:00Z'},
+    ])
+
+    rows = analytics.rollup(window='month')
+
+    assert [(row['window_start'], row['meetings']) for row in rows] == [
+        ('2026-01-01T00:00:00+00:00', 1),
+        ('2026-02-01T00:00:00+00:00', 2),
+    ]
+
+def test_rolling_mean_resets_per_team():
+    analytics = MeetingAnalytics()
+    base = parse_timestamp('2026-01-05T00:00:00Z')
+    day = 86400
+    analytics.ingest(
+        [{'team': 'a', 'timestamp': base + i * day, 'decisions_count': i + 1} for i in range(3)] +
+        [{'team': 'b', 'timestamp': base + i * day, 'decisions_count': 5} for i in range(2)]
+    )
+
+    rows = analytics.rollup(window='day', rolling=2)
+
+    assert [row['rolling_efficiency_score'] for row in rows] == [100.0, 150.0, 250.0, 500.0, 500.0]
+
+def test_rollup_filters_team_and_time_range():
+    analytics = MeetingAnalytics()
+    analytics.ingest([
+        {'team': 'a', 'timestamp': '2026-10-01T00:00:00Z'},
+        {'team': 'a', 'timestamp': '2026-10-10T00:00:00Z'},
+        {'team': 'b', 'timestamp': '2026-10-10T00:00:00Z'},
+    ])
+
+    rows = analytics.rollup(team='a', start='2026-10-05', window='day')
+
+    assert [(row['team'], row['meetings']) for row in rows] == [('a', 1)]
+    assert analytics.rollup(team='missing') == []
+
+def test_rollup_rejects_unknown_window():
+    with pytest.raises(ValueError):
+        MeetingAnalytics().rollup(window='30d')
+
+@pytest.mark.parametrize('record', [
+    {'team': 'c', 'timestamp': 1e30},
+    {'team': 'c', 'timestamp': float('inf')},
+    {'team': 'c', 'timestamp': -1},
+    {'team': 'c', 'timestamp': 'yesterday'},
+    {'team': 'c', 'total_goals': 2 ** 40},
+    {'team': 'c', 'decisions_count': -1},
+])
+def test_rejected_batch_stores_nothing(record):
+    analytics = MeetingAnalytics()
+
+    with pytest.raises(ValueError):
+        analytics.ingest([{'team': 'a'}, {'team': 'b'}, record])
+
+    assert len(analytics) == 0
+    assert analytics._team_names == []
+
+def test_sqlite_store_is_shared_and_survives_restart(tmp_path):
+    db_path = str(tmp_path / 'analytics.sqlite3')
+    worker_a = MeetingAnalytics(db_path=db_path)
+    worker_b = MeetingAnalytics(db_path=db_path)
+
+    worker_a.ingest([{'team': 'a', 'timestamp': '2026-10-19T09:00:00Z', 'decisions_count': 1}])
+    worker_b.ingest([{'team': 'b', 'timestamp': '2026-10-20T09:00:00Z', 'decisions_count': 2}])
+
+    expected = [('a', 100.0), ('b', 200.0)]
+    for analytics in (worker_a, worker_b, MeetingAnalytics(db_path=db_path)):
+        rows = analytics.rollup(window='week')
+        assert [(row['team'], row['efficiency_score']) for row in rows] == expected
@@ -0,0 +1,97 @@
+"""
+Tests for bounded request body ingestion
+"""
+
+import gzip
+import io
+import json
+
+import pytest
+from flask import Request
+from werkzeug.test import EnvironBuilder
+
+from request_ingestion import PayloadError, PayloadReader
+
+SCHEMA = {
+    'transcript': {'type': str, 'required': True, 'max_length': 'max_transcript_chars'},
+    'goals': {'type': list},
+    'timestamp': {'type': (str, int, float), 'max_length': 64}
+}
+
+@pytest.fixture
+def reader(monkeypatch):
+    monkeypatch.setenv('MAX_REQUEST_BYTES', '10000')
+    monkeypatch.setenv('MAX_DECOMPRESSED_BYTES', '50000')
+    monkeypatch.setenv('MAX_TRANSCRIPT_CHARS', '40000')
+    monkeypatch.setenv('MAX_LIST_ITEMS', '3')
+    return PayloadReader()
+
+def make_request(body, content_type='application/json', headers=None, chunked=False):
+    if isinstance(body, dict):
+        body = json.dumps(body).encode()
+    builder = EnvironBuilder(method='POST', input_stream=io.BytesIO(body), content_type=content_type, headers=headers or {})
+    if chunked:
+        builder.headers['Transfer-Encoding'] = 'chunked'
+    else:
+        builder.content_length = len(body)
+    environ = builder.get_environ()
+    if chunked:
+        environ['wsgi.input_terminated'] = True
+    return Request(environ)
+
+def read_error(reader, request):
+    with pytest.raises(PayloadError) as excinfo:
+        reader.read_json(request, SCHEMA)
+    return excinfo.value.status_code
+
+def test_reads_plain_and_gzip_bodies(reader):
+    payload = {'transcript': 'hello', 'goals': [{'completed': True}]}
+
+    assert reader.read_json(make_request(payload), SCHEMA) == payload
+    gzipped = make_request(gzip.compress(json.dumps(payload).encode()), headers={'Content-Encoding': 'gzip'})
+    assert reader.read_json(gzipped, SCHEMA) == payload
+
+def test_reads_chunked_body_without_content_length(reader):
+    request = make_request({'transcript': 'hello'}, chunked=True)
+
+    assert request.content_length is None
+    assert reader.read_json(request, SCHEMA) == {'transcript': 'hello'}
+
+def test_rejects_oversized_bodies(reader):
+    body = json.dumps({'transcript': 'a' * 20000}).encode()
+
+    assert read_error(reader, make_request(body)) == 413
+    assert read_error(reader, make_request(body, chunked=True)) == 413
+
+def test_rejects_gzip_bomb(reader):
+    bomb = gzip.compress(json.dumps({'transcript': 'a' * 5000000}).encode())
+    assert len(bomb) < reader.max_request_bytes
+
+    assert read_error(reader, make_request(bomb, headers={'Content-Encoding': 'gzip'})) == 413
+
+def test_rejects_bad_encodings(reader):
+    truncated = gzip.compress(json.dumps({'transcript': 'hello'}).encode())[:-10]
+
+    assert read_error(reader, make_request(truncated, headers={'Content-Encoding': 'gzip'})) == 400
+    assert read_error(reader, make_request(b'not gzip', headers={'Content-Encoding': 'gzip'})) == 400
+    assert read_error(reader, make_request(b'{}', headers={'Content-Encoding': 'br'})) == 415
+    assert read_error(reader, make_request(b'{}', content_type='text/plain')) == 415
+
+@pytest.mark.parametrize('body, status', [
+    (b'', 400),
+    (b'{not json', 400),
+    (b'[1, 2]', 400),
+    ({'goals': []}, 400),
+    ({'transcript': 5}, 400),
+    ({'transcript': True}, 400),
+    ({'transcript': 'x', 'timestamp': False}, 400),
+    ({'transcript': 'x', 'goals': [1, 2, 3, 4]}, 413),
+    ({'transcript': 'x', 'timestamp': '9' * 65}, 413),
+])
+def test_schema_validation(reader, body, status):
+    assert read_error(reader, make_request(body)) == status
+
+def test_optional_fields_may_be_null(reader):
+    payload = {'transcript': 'x', 'goals': None, 'timestamp': 1700000000}
+
+    assert reader.read_json(make_request(payload), SCHEMA) == payload
@@ -0,0 +1,112 @@
+"""
+Tests for the opt-in request profiler
+"""
+
+import hashlib
+import hmac
+import os
+import time
+
+import pytest
+
+from request_profiler import RequestProfiler
+
+SECRET = 'test-secret'
+
+def sign(timestamp, method='POST', path='/smart-assistant', secret=SECRET):
+    signature = hmac.new(secret.encode(), f"{timestamp}:{method}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{signature}"
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setenv('PROFILING_ENABLED', 'false')
+    monkeypatch.setenv('PROFILING_CPROFILE', 'false')
+    monkeypatch.setenv('PROFILING_SECRET', SECRET)
+    monkeypatch.setenv('PROFILING_HISTORY', '2')
+    return RequestProfiler()
+
+def test_signed_header_enables_profiling(profiler):
+    headers = {'X-Profile-Request': sign(int(time.time())), 'X-Profile-Mode': 'cprofile'}
+
+    assert profiler.should_profile('POST', '/smart-assistant', headers) == (True, True)
+
+@pytest.mark.parametrize('header', [
+    sign(int(time.time()), path='/meeting-analysis'),
+    sign(int(time.time()), secret='wrong'),
+    sign(int(time.time()) - 3600),
+    'not-a-timestamp:abc',
+    'missing-separator',
+    f"{int(time.time())}:\xe9",
+])
+def test_invalid_signatures_are_rejected(profiler, header):
+    assert profiler.should_profile('POST', '/smart-assistant', {'X-Profile-Request': header}) == (False, False)
+
+def test_cprofile_header_needs_signature(profiler):
+    profiler.enabled = True
+
+    assert profiler.should_profile('POST', '/smart-assistant', {'X-Profile-Mode': 'cprofile'}) == (True, False)
+    signed = {'X-Profile-Mode': 'cprofile', 'X-Profile-Request': sign(int(time.time()))}
+    assert profiler.should_profile('POST', '/smart-assistant', signed) == (True, True)
+
+def test_profile_ids_carry_worker_pid(profiler):
+    profile_id = profiler.start('GET', '/health')
+    profiler.finish(200)
+
+    assert profile_id.startswith(f"{os.getpid()}-")
+    assert profiler.get_profile(profile_id)['id'] == profile_id
+
+def test_signature_requires_secret(profiler):
+    profiler.secret = None
+
+    assert profiler.should_profile('POST', '/smart-assistant', {'X-Profile-Request': sign(int(time.time()))}) == (False, False)
+
+@pytest.mark.parametrize('auth, allowed', [
+    (f'Bearer {SECRET}', True),
+    ('Bearer wrong', False),
+    ('Bearer \xe9', False),
+    (SECRET, False),
+    ('', False),
+])
+def test_check_admin(profiler, auth, allowed):
+    assert profiler.check_admin({'Authorization': auth}) is allowed
+
+def test_phases_nest_and_export_collapsed_stacks(profiler):
+    class Upstream:
+        def query(self):
+            time.sleep(0.002)
+            return 'ok'
+
+    upstream = profiler.instrument(Upstream(), ['query'])
+    assert upstream.query() == 'ok'
+    assert profiler.list_profiles() == []
+
+    profile_id = profiler.start('POST', '/smart-assistant')
+    with profiler.phase('handler'):
+        upstream.query()
+    assert profiler.finish(200) == profile_id
+
+    profile = profiler.get_profile(profile_id)
+    phases = profiler.export(profile)['phases']
+    assert [(p['name'], p['depth']) for p in phases] == [('handler', 0), ('Upstream.query', 1)]
+
+    stacks = profiler.export(profile, 'collapsed').splitlines()
+    assert any(line.startswith('POST /smart-assistant;handler;Upstream.query ') for line in stacks)
+
+def test_history_keeps_last_profiles(profiler):
+    for _ in range(3):
+        profiler.start('GET', '/health')
+        profiler.finish(200)
+
+    prefix = f"{os.getpid()}-"
+    assert [p['id'] for p in profiler.list_profiles()] == [prefix + '3', prefix + '2']
+    assert profiler.get_profile(prefix + '1') is None
+
+def test_cprofile_capture_exports_pstats(profiler):
+    profile_id = profiler.start('GET', '/health', capture_cprofile=True)
+    sum(range(1000))
+    profiler.finish(200)
+
+    profile = profiler.get_profile(profile_id)
+    assert 'function calls' in profiler.export(profile, 'pstats')
+    with pytest.raises(ValueError):
+        profiler.export(profile, 'svg')
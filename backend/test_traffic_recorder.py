@@ -0,0 +1,172 @@
+"""
+Tests for upstream traffic record/replay
+"""
+
+import gzip
+import multiprocessing
+import os
+import time
+
+import pytest
+import requests
+
+import traffic_recorder
+from traffic_recorder import TrafficRecorder
+
+MASTRA_URL = 'https://api.mastra.ai/agents/meeting-assistant/query'
+JIRA_URL = 'https://api.composio.dev/jira/issues'
+
+class FakeResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+def fake_upstream(method, url, **kwargs):
+    time.sleep(0.02)
+    if url == JIRA_URL:
+        raise requests.exceptions.Timeout('upstream timed out')
+    return FakeResponse(200, '{"output": "%s"}' % kwargs['json']['input'])
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    path = tmp_path / 'cassette.jsonl.gz'
+    monkeypatch.setenv('UPSTREAM_CASSETTE', str(path))
+    monkeypatch.setenv('UPSTREAM_REPLAY_LATENCY_SCALE', '0')
+    monkeypatch.setattr(traffic_recorder.requests, 'request', fake_upstream)
+    return path
+
+def recorder(monkeypatch, mode):
+    monkeypatch.setenv('UPSTREAM_MODE', mode)
+    return TrafficRecorder()
+
+def record_entries(inputs):
+    recording = TrafficRecorder()
+    for text in inputs:
+        recording.post(MASTRA_URL, json={'input': text})
+    recording.close()
+
+def test_off_mode_uses_requests(monkeypatch, cassette):
+    assert recorder(monkeypatch, 'off').client() is requests
+    assert not cassette.exists()
+
+def test_record_then_replay_round_trip(monkeypatch, cassette):
+    recording = recorder(monkeypatch, 'record')
+    assert recording.post(MASTRA_URL, json={'input': 'first'}).text == '{"output": "first"}'
+    recording.post(MASTRA_URL, json={'input': 'second'})
+    with pytest.raises(requests.exceptions.Timeout):
+        recording.post(JIRA_URL, json={'summary': 'task'})
+    recording.close()
+
+    replay = recorder(monkeypatch, 'replay')
+
+    assert replay.post(MASTRA_URL, json={'input': 'second'}).json() == {'output': 'second'}
+    assert replay.post(MASTRA_URL, json={'input': 'first'}).json() == {'output': 'first'}
+    with pytest.raises(requests.exceptions.Timeout):
+        replay.post(JIRA_URL, json={'summary': 'task'})
+
+def test_replay_falls_back_to_url_and_rejects_unknown(monkeypatch, cassette):
+    recorder(monkeypatch, 'record').post(MASTRA_URL, json={'input': 'recorded'})
+    replay = recorder(monkeypatch, 'replay')
+
+    assert replay.post(MASTRA_URL, json={'input': 'different'}).json() == {'output': 'recorded'}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        replay.get('https://api.composio.dev/connections')
+
+def test_replay_scales_recorded_latency(monkeypatch, cassette):
+    recorder(monkeypatch, 'record').post(MASTRA_URL, json={'input': 'slow'})
+
+    monkeypatch.setenv('UPSTREAM_REPLAY_LATENCY_SCALE', '5')
+    replay = recorder(monkeypatch, 'replay')
+    started = time.perf_counter()
+    replay.post(MASTRA_URL, json={'input': 'slow'})
+
+    assert time.perf_counter() - started >= 0.1
+
+def test_relative_cassette_path_is_next_to_module(monkeypatch):
+    monkeypatch.setenv('UPSTREAM_CASSETTE', 'upstream_cassette.jsonl.gz')
+
+    expected = os.path.join(os.path.dirname(os.path.abspath(traffic_recorder.__file__)), 'upstream_cassette.jsonl.gz')
+    assert TrafficRecorder().cassette_path == expected
+
+def record_and_exit(inputs):
+    """
+    Record entries, then die without closing the recorder or running atexit
+    """
+    recording = TrafficRecorder()
+    for text in inputs:
+        recording.post(MASTRA_URL, json={'input': text})
+    os._exit(0)
+
+def entry_count(replay):
+    return sum(len(queue) for queue in replay._by_key.values())
+
+def test_worker_exiting_without_close_leaves_readable_cassette(monkeypatch, cassette):
+    monkeypatch.setenv('UPSTREAM_MODE', 'record')
+    # Fork so the child inherits the patched upstream
+    worker = multiprocessing.get_context('fork').Process(target=record_and_exit, args=(['a', 'b'],))
+    worker.start()
+    worker.join(5)
+
+    replay = recorder(monkeypatch, 'replay')
+    assert replay.post(MASTRA_URL, json={'input': 'b'}).json() == {'output': 'b'}
+    assert entry_count(replay) == 2
+
+@pytest.mark.parametrize('damage', [
+    lambda member: member[:len(member) // 2],
+    lambda member: member[:-8],
+    lambda member: member[:3],
+    lambda member: b'garbage',
+])
+def test_damaged_member_mid_cassette_keeps_later_entries(monkeypatch, cassette, damage):
+    monkeypatch.setenv('UPSTREAM_MODE', 'record')
+    record_entries(['first'])
+    partial = gzip.compress(b'{"key": "partial", "method": "POST", "url": "x", "elapsed": 0}\n' * 50)
+    with open(cassette, 'ab') as damaged:
+        damaged.write(damage(partial))
+    # Another writer keeps appending after the damaged entry
+    record_entries(['third', 'fourth'])
+
+    replay = recorder(monkeypatch, 'replay')
+
+    assert entry_count(replay) == 3
+    for text in ('first', 'third', 'fourth'):
+        assert replay.post(MASTRA_URL, json={'input': text}).json() == {'output': text}
+
+def test_short_writes_are_completed(monkeypatch, cassette):
+    real_write = os.write
+
+    def short_write(fd, data):
+        return real_write(fd, bytes(data[:7]))
+
+    monkeypatch.setenv('UPSTREAM_MODE', 'record')
+    monkeypatch.setattr(traffic_recorder.os, 'write', short_write)
+    record_entries(['slowly'])
+    monkeypatch.setattr(traffic_recorder.os, 'write', real_write)
+
+    replay = recorder(monkeypatch, 'replay')
+    assert replay.post(MASTRA_URL, json={'input': 'slowly'}).json() == {'output': 'slowly'}
+
+def test_failed_write_is_raised(monkeypatch, cassette):
+    def full_disk(fd, data):
+        raise OSError(28, 'No space left on device')
+
+    recording = recorder(monkeypatch, 'record')
+    monkeypatch.setattr(traffic_recorder.os, 'write', full_disk)
+
+    with pytest.raises(OSError):
+        recording.post(MASTRA_URL, json={'input': 'lost'})
+
+def test_concurrent_recorders_share_one_cassette(monkeypatch, cassette):
+    monkeypatch.setenv('UPSTREAM_MODE', 'record')
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=record_entries, args=([f'{worker}-{i}' * 2000 for i in range(20)],))
+        for worker in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    replay = recorder(monkeypatch, 'replay')
+    assert entry_count(replay) == 80
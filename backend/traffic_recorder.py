@@ -0,0 +1,215 @@
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables from root directory
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+logger = logging.getLogger(__name__)
+
+# Every gzip member starts with the magic bytes and the deflate method byte
+GZIP_MEMBER_HEADER = b'\x1f\x8b\x08'
+
+class ReplayResponse:
+    """
+    Minimal stand-in for requests.Response built from a cassette entry
+    """
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+class TrafficRecorder:
+    """
+    Record or replay upstream Mastra/Composio HTTP traffic
+
+    UPSTREAM_MODE selects the behaviour:
+    - off: calls go straight to `requests`
+    - record: calls go upstream and each request/response pair, with its
+      latency, is appended to the UPSTREAM_CASSETTE file
+    - replay: calls are answered from the cassette without touching the
+      network, sleeping for the recorded latency times
+      UPSTREAM_REPLAY_LATENCY_SCALE (0 disables the delay)
+
+    The cassette is gzip-compressed JSON lines, with every entry written
+    as its own gzip member in a single O_APPEND write, so several workers
+    can record into the same file. Replay decodes member by member and
+    skips ahead to the next member header past any damaged one, so a write
+    cut short (disk full, worker killed) loses only that entry.
+
+    Requests are matched on method, URL and a hash of the JSON body;
+    repeated identical requests are answered in recorded order and cycle
+    once exhausted. A request with no body match falls back to the next
+    recording for the same URL.
+    """
+
+    def __init__(self):
+        self.mode = os.getenv('UPSTREAM_MODE', 'off').lower()
+        # Relative paths are resolved next to this module, not the working directory
+        self.cassette_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            os.getenv('UPSTREAM_CASSETTE', 'upstream_cassette.jsonl.gz')
+        )
+        self.latency_scale = float(os.getenv('UPSTREAM_REPLAY_LATENCY_SCALE', 1.0))
+
+        self._lock = threading.Lock()
+        self._fd = None
+        self._by_key = defaultdict(deque)
+        self._by_url = defaultdict(deque)
+
+        if self.mode == 'record':
+            self._fd = os.open(self.cassette_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            atexit.register(self.close)
+            logger.info(f"Recording upstream traffic to {self.cassette_path}")
+        elif self.mode == 'replay':
+            self._load()
+        elif self.mode != 'off':
+            raise ValueError(f"Unknown UPSTREAM_MODE '{self.mode}', expected off, record or replay")
+
+    def client(self):
+        """
+        HTTP client for MastraHandler/ComposioHelper: this recorder, or `requests` when off
+        """
+        return requests if self.mode == 'off' else self
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        key = self._key(method, url, kwargs.get('json'))
+        if self.mode == 'replay':
+            return self._replay(key, method, url)
+        return self._record(key, method, url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _record(self, key, method, url, **kwargs):
+        entry = {'key': key, 'method': method, 'url': url}
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            entry['elapsed'] = time.perf_counter() - started
+            entry['error'] = type(e).__name__
+            entry['message'] = str(e)
+            self._write(entry)
+            raise
+
+        entry['elapsed'] = time.perf_counter() - started
+        entry['status'] = response.status_code
+        entry['body'] = response.text
+        self._write(entry)
+        return response
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        member = gzip.compress(line.encode('utf-8'))
+        with self._lock:
+            if self._fd is None:
+                return
+            # A single O_APPEND write keeps members from concurrent workers
+            # apart; loop on short writes rather than silently truncating
+            remaining = memoryview(member)
+            try:
+                while remaining:
+                    written = os.write(self._fd, remaining)
+                    remaining = remaining[written:]
+            except OSError as e:
+                logger.error(f"Failed to write upstream cassette entry to {self.cassette_path}: {str(e)}")
+                raise
+
+    def _replay(self, key, method, url):
+        with self._lock:
+            queue = self._by_key.get(key) or self._by_url.get((method, url))
+            if not queue:
+                entry = None
+            else:
+                entry = queue[0]
+                queue.rotate(-1)
+
+        if entry is None:
+            logger.warning(f"No recorded response for {method} {url}")
+            raise requests.exceptions.ConnectionError(f"No recorded response for {method} {url}")
+        if entry['key'] != key:
+            logger.warning(f"Replaying {method} {url} with a response recorded for a different request body")
+
+        if self.latency_scale > 0:
+            time.sleep(entry['elapsed'] * self.latency_scale)
+
+        if 'error' in entry:
+            error = getattr(requests.exceptions, entry['error'], requests.exceptions.RequestException)
+            raise error(entry.get('message', ''))
+        return ReplayResponse(entry['status'], entry['body'])
+
+    def _load(self):
+        if not os.path.exists(self.cassette_path):
+            raise FileNotFoundError(f"Upstream cassette not found: {self.cassette_path}")
+
+        with open(self.cassette_path, 'rb') as cassette:
+            data = memoryview(cassette.read())
+
+        count = 0
+        damaged = 0
+        position = 0
+        while position < len(data):
+            if data[position:position + 3] != GZIP_MEMBER_HEADER:
+                # Resynchronise on the next member after damaged bytes
+                damaged += 1
+                position = data.obj.find(GZIP_MEMBER_HEADER, position + 1)
+                if position == -1:
+                    break
+                continue
+
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                payload = decompressor.decompress(data[position:])
+            except zlib.error:
+                payload = None
+            if payload is None or not decompressor.eof:
+                # Truncated or corrupt member; skip past its header and rescan
+                damaged += 1
+                next_member = data.obj.find(GZIP_MEMBER_HEADER, position + 1)
+                if next_member == -1:
+                    break
+                position = next_member
+                continue
+            position = len(data) - len(decompressor.unused_data)
+
+            for line in payload.splitlines(keepends=True):
+                if not line.endswith(b'\n') or not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    damaged += 1
+                    continue
+                self._by_key[entry['key']].append(entry)
+                self._by_url[(entry['method'], entry['url'])].append(entry)
+                count += 1
+
+        if damaged:
+            logger.warning(f"Skipped {damaged} damaged entries in upstream cassette {self.cassette_path}")
+        logger.info(f"Loaded {count} upstream responses from {self.cassette_path}")
+
+    def _key(self, method, url, body):
+        digest = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()
+        return f"{method} {url} {digest}"